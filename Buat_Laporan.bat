@@ -0,0 +1,4 @@
+@echo off
+cd /d %~dp0
+python report.py --jadwal 06:00
+pause
\ No newline at end of file
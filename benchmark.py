@@ -0,0 +1,333 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+import compact
+import data_cache
+import data_store
+import db
+import downsample
+import export
+import kpi
+import migrasi
+
+# --- KONFIGURASI BENCHMARK ---
+TAHUN = [1, 5] # panjang histori workbook sintetis
+TRANSAKSI = [50_000, 500_000] # jumlah baris transaksi_panen (tambahkan 5000000 lewat --transaksi)
+N_BLOK = 283 # sama dengan data_produksi.xlsx
+AFD = "ABCDEF"
+ULANG = 3 # pengulangan per tahap; yang dilaporkan waktu tercepat
+TOLERANSI = 0.25 # batas kenaikan waktu sebelum dianggap regresi
+AMBANG_DETIK = 0.01 # selisih di bawah ini dianggap noise
+GEN_CHUNK = 500_000
+
+
+# --- DATA SINTETIS (BENTUK SAMA DENGAN WORKBOOK ASLI) ---
+def make_master(path, years, seed=0):
+    """master_data_produksi.xlsx sintetis: 5 sheet harian selama `years` tahun."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2020-01-01", periods=365 * years, freq="D")
+    n = len(dates)
+    afd_ton = rng.gamma(4, 10, (n, len(AFD))).round(2)
+    wb = openpyxl.Workbook(write_only=True)
+
+    ws = wb.create_sheet("Dashboard")
+    ws.append(["Tanggal", "Aktual Produksi", "AKP", "Restan", "Curah Hujan", "TK Panen (ORG)", "TK Panen (%)",
+               "TK Perawatan (ORG)", "TK Perawatan (%)", "Luas Panen (Ha)"])
+    tk = rng.integers(150, 270, n)
+    for i, d in enumerate(dates):
+        ws.append([d.to_pydatetime(), afd_ton[i].sum().round(2), int(rng.integers(100, 300)), round(rng.random() * 40, 2),
+                   int(rng.integers(0, 60)), int(tk[i]), tk[i] / 271, int(rng.integers(100, 200)), rng.random(),
+                   round(rng.random() * 600, 2)])
+
+    ws = wb.create_sheet("Prod Afd")
+    ws.append(["Tanggal"] + [f"Afdeling {a} (Ton)" for a in AFD] + ["ESTATE (Ton)"])
+    for i, d in enumerate(dates):
+        ws.append([d.to_pydatetime()] + afd_ton[i].tolist() + [afd_ton[i].sum()])
+
+    ws = wb.create_sheet("Budget & BBC")
+    ws.append(["Tanggal", "Budget (Ton)", "BBC (Ton)"])
+    for d in dates:
+        ws.append([d.to_pydatetime(), 250 + rng.random() * 50, 220 + rng.random() * 50])
+
+    for name in ("Grading Mentah", "Grading Mengkal"):
+        ws = wb.create_sheet(name)
+        ws.append(["Tanggal"] + [f"Afdeling {a}" for a in AFD for _ in range(2)] + ["ESTATE", "ESTATE"])
+        ws.append([None] + ["Janjang", "%"] * (len(AFD) + 1))
+        for d in dates:
+            row = [d.to_pydatetime()]
+            for _ in range(len(AFD) + 1):
+                jjg = int(rng.integers(0, 3000))
+                row += [jjg, round(rng.random() * 5, 2) if jjg else "Tidak Grading"]
+            ws.append(row)
+    wb.save(path)
+
+
+def make_blok(path, years, n_blok=N_BLOK, seed=0):
+    """data_produksi.xlsx sintetis: 5 sheet blok, satu kolom per bulan. Mengembalikan daftar blok."""
+    rng = np.random.default_rng(seed)
+    months = pd.date_range("2020-01-01", periods=12 * years, freq="MS")
+    afd = [AFD[i * len(AFD) // n_blok] for i in range(n_blok)]
+    blok = [f"{a}{i + 1:02d}" for i, a in enumerate(afd)]
+    ha = rng.uniform(5, 30, n_blok).round(2)
+    tbs = rng.integers(300, 3500, (n_blok, len(months))).astype(float)
+    bjr = rng.uniform(12, 22, (n_blok, len(months)))
+    metrics = {"tbs": tbs, "tonase": tbs * bjr, "yph": tbs * bjr / 1000 / ha[:, None],
+               "brondol": tbs * rng.uniform(0.5, 1.2, tbs.shape), "bjr": bjr}
+    wb = openpyxl.Workbook(write_only=True)
+    for sheet in data_cache.BLOK_SHEETS:
+        ws = wb.create_sheet(sheet)
+        ws.append(["AFD", "NO BLOCK", "BLOK", "HA", "TAHUN TANAM"] + [m.to_pydatetime() for m in months] + ["TOTAL"])
+        for i in range(n_blok):
+            vals = metrics[sheet][i]
+            ws.append([afd[i], f"{i + 1:03d}", blok[i], ha[i], int(2000 + i % 15)] + vals.tolist() + [vals.sum()])
+    wb.save(path)
+    return list(zip(afd, blok))
+
+
+def make_transaksi(path, n, bloks, years, seed=0):
+    """CSV transaksi_panen sintetis (kolom migrasi.KOLOM), ditulis bertahap."""
+    rng = np.random.default_rng(seed)
+    span = 365 * years * 86400
+    afd, blok = map(np.array, zip(*bloks))
+    start = pd.Timestamp("2020-01-01")
+    for i in range(0, n, GEN_CHUNK):
+        m = min(GEN_CHUNK, n - i)
+        idx = rng.integers(0, len(bloks), m)
+        tbs = rng.integers(1, 200, m)
+        pd.DataFrame({
+            "Date": (start + pd.to_timedelta(rng.integers(0, span, m), unit="s")).strftime('%Y-%m-%d %H:%M:%S'),
+            "Blok Name": blok[idx],
+            "Blok SAP": np.char.add("SAP-", blok[idx]),
+            "Div Code": afd[idx],
+            "Jumlah TBS": tbs,
+            "Brondolan": (tbs * rng.uniform(0.5, 1.2, m)).round(1),
+            "Estimasi Tonase": (tbs * rng.uniform(0.012, 0.022, m)).round(4),
+        }).to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+
+
+# --- PENGUKURAN ---
+def measure(fn, repeat=ULANG, setup=None):
+    """Waktu tercepat dari `repeat` kali jalan, lalu satu jalan tambahan di bawah
+    tracemalloc untuk puncak memori (tracing memperlambat, jadi tidak ikut diukur waktunya).
+
+    Alokasi native Arrow/SQLite tidak tercatat tracemalloc, jadi angka memori
+    adalah batas bawah; tetap berguna untuk membandingkan antar versi."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        if setup: setup()
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    if setup: setup()
+    tracemalloc.start()
+    try:
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, {"detik": round(best, 6), "puncak_mb": round(peak / 2**20, 3)}
+
+
+def cek_download(data):
+    """Gagal (ValueError) jika hasil ekspor bukan bytes berisi, tipe yang dikirim ke download_button."""
+    if not isinstance(data, bytes):
+        raise ValueError(f"Hasil ekspor bertipe {type(data).__name__}, bukan bytes")
+    if not data:
+        raise ValueError("Hasil ekspor kosong")
+
+
+def _cold(path):
+    def setup():
+        shutil.rmtree(data_cache.cache_dir_for(path), ignore_errors=True)
+        data_cache.clear_memo()
+    return setup
+
+
+def run_workbook(years, workdir, repeat=ULANG):
+    """load -> filter -> agregasi untuk workbook sintetis sepanjang `years` tahun."""
+    master_path = os.path.join(workdir, f"master_{years}y.xlsx")
+    blok_path = os.path.join(workdir, f"blok_{years}y.xlsx")
+    db_path = os.path.join(workdir, f"bench_{years}y.db")
+    make_master(master_path, years)
+    make_blok(blok_path, years)
+    # Ukuran file dibandingkan dengan data_cache.PARALLEL_MIN_BYTES (ambang pool parser per workbook)
+    print(f"   master {os.path.getsize(master_path) / 1024:,.0f} KB, blok {os.path.getsize(blok_path) / 1024:,.0f} KB")
+    res = {}
+
+    master, res["load_data (dingin)"] = measure(lambda: data_store.load_data(master_path), repeat, _cold(master_path))
+    _, res["load_data (hangat)"] = measure(lambda: data_store.load_data(master_path), repeat, data_cache.clear_memo)
+    blok, res["load_data_blok (dingin)"] = measure(lambda: data_store.load_data_blok(blok_path), repeat, _cold(blok_path))
+    _, res["load_data_blok (hangat)"] = measure(lambda: data_store.load_data_blok(blok_path), repeat, data_cache.clear_memo)
+    series, res["build_series"] = measure(lambda: data_store.build_series(master), repeat)
+    _, res["BlokCube.from_frames"] = measure(lambda: compact.BlokCube.from_frames(dict(zip(data_cache.BLOK_SHEETS, blok))), repeat)
+
+    # Ingest dingin kedua workbook: berurutan vs paralel (pool proses data_cache + thread per workbook)
+    books = {master_path: data_cache.MASTER_SHEETS, blok_path: data_cache.BLOK_SHEETS}
+    semua = data_cache.MASTER_SHEETS + data_cache.BLOK_SHEETS
+    def cold_both():
+        _cold(master_path)()
+        _cold(blok_path)()
+    workers = data_cache.WORKERS
+    try:
+        data_cache.WORKERS = 1
+        _, res["ingest 2 workbook (berurutan)"] = measure(lambda: data_store.read_books(books, semua), repeat, cold_both)
+        if workers > 1:
+            data_cache.WORKERS = workers
+            data_cache.start_workers() # biaya start proses tidak ikut diukur
+            min_bytes, data_cache.PARALLEL_MIN_BYTES = data_cache.PARALLEL_MIN_BYTES, 0
+            try:
+                _, res[f"ingest 2 workbook (paralel x{workers})"] = measure(lambda: data_store.read_books(books, semua), repeat, cold_both)
+            finally:
+                data_cache.PARALLEL_MIN_BYTES = min_bytes
+    finally:
+        data_cache.WORKERS = workers
+
+    tgl_awal, tgl_akhir = series["Dashboard"].span()
+    bulan_awal = tgl_akhir.replace(day=1)
+    sheets = ("Dashboard", "Grading Mentah", "Grading Mengkal", "Prod Afd")
+    _, res["filter_and_format (1 bulan)"] = measure(lambda: [series[s].window(bulan_awal, tgl_akhir) for s in sheets], repeat)
+    f_dash, f_mentah, f_mengkal, f_prod = [series[s].window(tgl_awal, tgl_akhir) for s in sheets]
+    _, res["filter_and_format (semua)"] = measure(lambda: [series[s].window(tgl_awal, tgl_akhir) for s in sheets], repeat)
+
+    afd_cols = [c for c in f_prod.columns if 'Afd' in c and '(Ton)' in c]
+    _, res["summary_row"] = measure(lambda: (kpi.summary_row(f_prod, "TOTAL", afd_cols + ['TOTAL']),
+                                             kpi.summary_row(f_mentah, "TOTAL / RERATA"),
+                                             kpi.summary_row(f_mengkal, "TOTAL / RERATA")), repeat)
+
+    def kpis():
+        cols = kpi.kpi_columns(tuple(f_dash.columns), tuple(master[2].columns))
+        y, m = tgl_akhir.year, tgl_akhir.month
+        return kpi.dashboard_kpis(f_dash, f_mentah, f_mengkal, cols,
+                                  series["Dashboard"].month_sum("Aktual Produksi", y, m),
+                                  series["Budget & BBC"].month_sum(cols.budget, y, m),
+                                  series["Budget & BBC"].month_sum(cols.bbc, y, m))
+    _, res["dashboard_kpis"] = measure(kpis, repeat)
+    _, res["downsample"] = measure(lambda: [
+        downsample.downsample(series["Dashboard"].window_dates(tgl_awal, tgl_akhir), f_dash['Aktual Produksi'], "sum"),
+        downsample.downsample(series["Grading Mentah"].window_dates(tgl_awal, tgl_akhir), f_mentah['ESTATE %'], "mean"),
+        downsample.downsample(series["Grading Mengkal"].window_dates(tgl_awal, tgl_akhir), f_mengkal['ESTATE %'], "mean"),
+    ], repeat)
+
+    # Ekspor per format; hasilnya harus lolos konversi download_button(data=callable) milik Streamlit
+    snap = data_store.Snapshot(1, series)
+    for fmt in export.FORMATS:
+        data, res[f"export Dashboard ({fmt})"] = measure(lambda: export.export("Dashboard", fmt, snap, tgl_awal, tgl_akhir), repeat)
+        cek_download(data)
+
+    def fresh_db():
+        for suffix in ("", "-wal", "-shm"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(db_path + suffix)
+        db.ensure_schema(db_path)
+    _, res["sync_blok + rollup"] = measure(lambda: db.sync_blok(blok_path, blok, db_path), repeat, fresh_db)
+    _, res["trend Summary Blok"] = measure(lambda: db.rollup_bulanan("ESTATE", db_path), repeat)
+    return res
+
+
+def run_transaksi(n, workdir, repeat=ULANG, years=5):
+    """Impor & query transaksi_panen sebanyak `n` baris."""
+    blok_path = os.path.join(workdir, f"blok_trx_{years}y.xlsx")
+    csv_path = os.path.join(workdir, f"transaksi_{n}.csv")
+    db_path = os.path.join(workdir, f"bench_trx_{n}.db")
+    bloks = make_blok(blok_path, years)
+    make_transaksi(csv_path, n, bloks, years)
+    res = {}
+
+    def fresh_db():
+        for suffix in ("", "-wal", "-shm"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(db_path + suffix)
+        db.ensure_schema(db_path)
+        db.sync_blok(blok_path, data_store.read_blok(blok_path), db_path)
+
+    def impor():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return migrasi.load(csv_path, db_path)
+    # Impor diulang dengan DB baru; "upsert ulang" mengukur jalur UPDATE pada data yang sama
+    _, res["migrasi.load"] = measure(impor, 1, fresh_db)
+    _, res["migrasi.load (upsert ulang)"] = measure(impor, 1)
+    return res
+
+
+# --- BASELINE ---
+def compare(results, baseline, tolerance=TOLERANSI):
+    """Daftar (skenario, tahap, detik baseline, detik sekarang) yang lebih lambat dari toleransi."""
+    slower = []
+    for scenario, stages in results.items():
+        for stage, now in stages.items():
+            base = baseline.get("hasil", {}).get(scenario, {}).get(stage)
+            if base and now["detik"] > base["detik"] * (1 + tolerance) and now["detik"] - base["detik"] > AMBANG_DETIK:
+                slower.append((scenario, stage, base["detik"], now["detik"]))
+    return slower
+
+
+def report(results):
+    for scenario, stages in results.items():
+        print(f"\n== {scenario} ==")
+        for stage, m in stages.items():
+            print(f"   {stage:<32} {m['detik'] * 1000:>10.1f} ms {m['puncak_mb']:>10.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline load -> filter -> agregasi dengan data sintetis")
+    parser.add_argument("--tahun", type=int, nargs="*", default=TAHUN)
+    parser.add_argument("--transaksi", type=int, nargs="*", default=TRANSAKSI)
+    parser.add_argument("--ulang", type=int, default=ULANG)
+    parser.add_argument("--simpan", help="tulis hasil sebagai baseline JSON")
+    parser.add_argument("--banding", help="bandingkan dengan baseline JSON; exit 1 jika ada regresi")
+    parser.add_argument("--toleransi", type=float, default=TOLERANSI)
+    parser.add_argument("--dir", help="folder kerja (default: folder sementara yang dihapus setelah selesai)")
+    parser.add_argument("--workers", type=int, default=data_cache.WORKERS, help="proses parser untuk ingest paralel")
+    args = parser.parse_args()
+    data_cache.WORKERS = args.workers
+    if args.workers > 1:
+        data_cache.start_workers() # start proses parser di luar pengukuran
+
+    workdir = args.dir or tempfile.mkdtemp(prefix="bench_sawit_")
+    os.makedirs(workdir, exist_ok=True)
+    results = {}
+    try:
+        for years in args.tahun:
+            print(f"⏱️ Workbook {years} tahun...")
+            results[f"workbook {years} tahun"] = run_workbook(years, workdir, args.ulang)
+        for n in args.transaksi:
+            print(f"⏱️ Transaksi {n:,} baris...")
+            results[f"transaksi {n} baris"] = run_transaksi(n, workdir, args.ulang)
+    finally:
+        if not args.dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    report(results)
+
+    if args.simpan:
+        with open(args.simpan, "w") as f:
+            json.dump({"waktu": datetime.datetime.now().isoformat(timespec="seconds"),
+                       "mesin": {"python": platform.python_version(), "pandas": pd.__version__,
+                                 "sqlite": sqlite3.sqlite_version, "cpu": os.cpu_count(), "os": platform.platform()},
+                       "hasil": results}, f, indent=2)
+        print(f"\n✅ Baseline disimpan ke {args.simpan}")
+    if args.banding:
+        with open(args.banding) as f:
+            slower = compare(results, json.load(f), args.toleransi)
+        for scenario, stage, base, now in slower:
+            print(f"❌ Regresi {scenario} / {stage}: {base * 1000:.1f} ms -> {now * 1000:.1f} ms")
+        if slower:
+            raise SystemExit(1)
+        print("✅ Tidak ada regresi dibanding baseline.")
+
+
+if __name__ == "__main__":
+    main()
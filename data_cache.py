@@ -0,0 +1,398 @@
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from collections import defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import xml.etree.ElementTree as ET
+
+import openpyxl
+from openpyxl.cell.cell import ERROR_CODES
+import pandas as pd
+import pyarrow as pa
+from pandas.io.parsers import TextParser
+
+# --- KONFIGURASI CACHE ---
+# Cache kolomar (Arrow IPC) disimpan di samping workbook, satu file per sheet.
+# Pembersihan data dilakukan sekali saat ingest, pemanggilan berikutnya cukup
+# memory-map kolom yang sudah bertipe tanpa membuka openpyxl.
+CACHE_DIR = ".cache_data"
+LOCK_FILE = "cache.lock"
+META_FILE = "meta.json"
+MAX_CHUNKS = 32 # setelah ini chunk delta dipadatkan jadi satu file
+
+# Sheet yang berubah di-parse paralel di proses terpisah (openpyxl terikat GIL).
+# Workbook kecil tetap berurutan: biaya kirim tugas ke proses lebih besar dari parse-nya.
+WORKERS = min(5, len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1) # 1 = selalu berurutan
+# PLACEHOLDER, belum diukur (hanya tersedia mesin 1 CPU). Kedua workbook saat ini (25 KB & 186 KB) di bawah
+# ambang ini, jadi pool belum pernah dipakai di produksi dan percepatannya belum terbukti. Tetapkan dari
+# mesin multi-core: `python benchmark.py --tahun 1 3 5 10` mencetak ukuran tiap workbook sintetis dan
+# membandingkan "ingest 2 workbook (berurutan)" vs "(paralel xN)"; pakai ukuran terkecil yang lebih cepat paralel.
+PARALLEL_MIN_BYTES = 512 * 1024
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+MASTER_SHEETS = ("Dashboard", "Prod Afd", "Budget & BBC", "Grading Mentah", "Grading Mengkal")
+BLOK_SHEETS = ("tbs", "tonase", "yph", "brondol", "bjr")
+
+GRADING_COLS = ['Tanggal', 'Afd A (JJG)', 'Afd A %', 'Afd B (JJG)', 'Afd B %', 'Afd C (JJG)', 'Afd C %',
+                'Afd D (JJG)', 'Afd D %', 'Afd E (JJG)', 'Afd E %', 'Afd F (JJG)', 'Afd F %', 'ESTATE (JJG)', 'ESTATE %']
+
+
+# --- PEMBERSIHAN DATA (DIJALANKAN SEKALI SAAT INGEST) ---
+def clean_master_sheet(name, df):
+    df['Tanggal'] = pd.to_datetime(df['Tanggal'])
+    if name in ("Grading Mentah", "Grading Mengkal"):
+        df.columns = GRADING_COLS
+        for col in df.columns:
+            if '%' in col:
+                df[col] = pd.to_numeric(df[col].astype(str).str.replace('%', ''), errors='coerce')
+            elif '(JJG)' in col:
+                # Baris sub-header ("Janjang") membuat kolom bertipe campuran
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+# --- FUNGSI INTERNAL ---
+def cache_dir_for(path):
+    path = os.path.abspath(path)
+    return os.path.join(os.path.dirname(path), CACHE_DIR, os.path.basename(path))
+
+
+def file_key(path):
+    st_ = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st_.st_size, "mtime": st_.st_mtime}
+
+
+def _sheet_slug(name):
+    return re.sub(r'[^0-9A-Za-z]+', '_', name).strip('_')
+
+
+def _read_meta(cdir):
+    try:
+        with open(os.path.join(cdir, META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(cdir, meta):
+    tmp = os.path.join(cdir, META_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(cdir, META_FILE))
+
+
+def sheet_crcs(path):
+    """CRC32 tiap part XML worksheet dari direktori zip xlsx (tanpa dekompresi).
+    Sheet yang CRC-nya sama dipastikan tidak berubah isinya."""
+    with zipfile.ZipFile(path) as z:
+        wb = ET.fromstring(z.read("xl/workbook.xml"))
+        rels = ET.fromstring(z.read("xl/_rels/workbook.xml.rels"))
+        targets = {r.get("Id"): r.get("Target") for r in rels}
+        crcs = {}
+        for sh in wb.iter(NS_MAIN + "sheet"):
+            target = targets[sh.get(NS_REL + "id")]
+            part = target.lstrip("/") if target.startswith("/") else "xl/" + target
+            crcs[sh.get("name")] = z.getinfo(part).CRC
+        return crcs
+
+
+def _trim(row):
+    # Sel error Excel (#REF!, #DIV/0!, ...) dibaca NaN, sama seperti pd.read_excel
+    row = [float('nan') if v in ERROR_CODES else v for v in row]
+    while row and row[-1] is None: row.pop()
+    return row
+
+
+def _header_key(header):
+    return [None if h is None else str(h) for h in header]
+
+
+def _fingerprint(row):
+    return hashlib.blake2b(repr(row).encode(), digest_size=8).hexdigest()
+
+
+def _read_rows(ws, skip=0):
+    """Stream baris sheet (mode read-only). Mengembalikan header, fingerprint
+    seluruh baris data, dan baris mulai indeks `skip`."""
+    it = ws.iter_rows(values_only=True)
+    header = _trim(next(it, ()))
+    fps, rows = [], []
+    for row in it:
+        row = _trim(row)
+        fps.append(_fingerprint(row))
+        if len(fps) > skip:
+            rows.append(row)
+    # Buang baris kosong di ujung sheet, sama seperti read_excel
+    while fps and fps[-1] == _fingerprint([]):
+        fps.pop()
+        if rows: rows.pop()
+    return header, fps, rows
+
+
+def _frame(header, rows, width):
+    # TextParser = parser yang dipakai pd.read_excel (inferensi tipe, "Unnamed: i", kolom duplikat ".1")
+    data = [list(header) + [None] * (width - len(header))] + [r + [None] * (width - len(r)) for r in rows]
+    df = TextParser(data, header=0).read()
+    # Header bulan dari openpyxl berupa datetime; disamakan dengan hasil baca cache (pd.Timestamp)
+    df.columns = [pd.Timestamp(c) if isinstance(c, datetime.datetime) else c for c in df.columns]
+    return df
+
+
+def _to_arrow(df):
+    # Arrow butuh nama kolom string & kolom bertipe tunggal
+    df = df.copy()
+    date_cols = [str(c) for c in df.columns if isinstance(c, datetime.datetime)]
+    df.columns = [str(c) for c in df.columns]
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith("mixed"):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return pa.Table.from_pandas(df, preserve_index=False), date_cols
+
+
+def write_chunk(cdir, fname, df, schema=None):
+    table, date_cols = _to_arrow(df)
+    if schema is not None and table.schema != schema:
+        # Samakan tipe delta dengan chunk pertama (mis. kolom kosong -> double)
+        try:
+            table = table.cast(schema)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError):
+            pass
+    tmp = os.path.join(cdir, fname + ".tmp")
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, os.path.join(cdir, fname))
+    return date_cols
+
+
+def read_chunk(cdir, fname, date_cols=()):
+    with pa.memory_map(os.path.join(cdir, fname), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    df = table.to_pandas(split_blocks=True)
+    date_cols = set(date_cols)
+    if date_cols:
+        df.columns = [pd.Timestamp(c) if c in date_cols else c for c in df.columns]
+    return df
+
+
+# Frame yang sudah dibaca per proses: {(cdir, sheet): (daftar chunk, DataFrame)}.
+# Jika hanya ada chunk baru, cukup chunk itu yang dibaca lalu digabung.
+_memo = {}
+_lock = threading.Lock()
+_dir_locks = defaultdict(threading.Lock) # satu lock per folder cache: workbook berbeda bisa dimuat bersamaan
+_pool = None
+
+
+def _get_pool():
+    # Pool dibuat sekali per proses dan dipakai ulang; "spawn" aman dipanggil dari thread mana pun (juga di Windows)
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _drop_pool(pool):
+    # Pool rusak (worker mati/OOM) tidak bisa dipakai lagi: buang, pool baru dibuat saat dibutuhkan
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def clear_memo():
+    """Lupakan frame yang sudah dibaca di proses ini (baca berikutnya dari file Arrow)."""
+    with _lock:
+        _memo.clear()
+
+
+def start_workers():
+    """Nyalakan semua proses parser sekarang (mis. saat start server), bukan saat workbook pertama berubah."""
+    pool = _get_pool()
+    list(pool.map(abs, range(WORKERS * 2)))
+    return pool
+
+
+def _frame_from_chunks(cdir, sheet, info):
+    files = tuple(info["files"])
+    prev = _memo.get((cdir, sheet))
+    if prev and prev[0] == files:
+        return prev[1]
+    if prev and files[:len(prev[0])] == prev[0]:
+        parts = [prev[1]] + [read_chunk(cdir, f, info["date_columns"]) for f in files[len(prev[0]):]]
+    else:
+        parts = [read_chunk(cdir, f, info["date_columns"]) for f in files]
+    df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    _memo[(cdir, sheet)] = (files, df)
+    return df
+
+
+def _chunk_schema(cdir, fname):
+    with pa.memory_map(os.path.join(cdir, fname), "r") as source:
+        return pa.ipc.open_file(source).schema
+
+
+def _chunk_name(meta, sheet):
+    meta["seq"] = meta.get("seq", 0) + 1
+    return f"{_sheet_slug(sheet)}.{meta['seq']:06d}.arrow"
+
+
+def _rebuild_sheet(cdir, fname, sheet, header, fps, rows, cleaner):
+    width = max([len(header)] + [len(r) for r in rows])
+    df = _frame(header, rows, width)
+    if cleaner: df = cleaner(sheet, df)
+    date_cols = write_chunk(cdir, fname, df)
+    _memo[(cdir, sheet)] = ((fname,), df)
+    return {"files": [fname], "date_columns": date_cols, "raw_header": _header_key(header),
+            "width": width, "fingerprints": fps}
+
+
+def _append_sheet(cdir, fname, sheet, info, fps, rows, cleaner):
+    df = _frame(info["raw_header"], rows, info["width"])
+    if cleaner: df = cleaner(sheet, df)
+    write_chunk(cdir, fname, df, _chunk_schema(cdir, info["files"][0]))
+    return dict(info, files=info["files"] + [fname], fingerprints=fps)
+
+
+def _ingest_sheet(ws, cdir, sheet, prev, fname, cleaner):
+    """Stream satu sheet yang berubah lalu tulis chunk-nya: delta jika hanya ada baris baru, selain itu ulang penuh."""
+    n_prev = len(prev["fingerprints"]) if prev else 0
+    header, fps, rows = _read_rows(ws, skip=n_prev)
+    # Delta murni = header sama & semua baris lama tidak berubah (tiap baris dicek lewat fingerprint-nya,
+    # mis. bulan yang baru diisi untuk blok di tengah sheet blok)
+    appended = (prev is not None and prev["raw_header"] == _header_key(header)
+                and fps[:n_prev] == prev["fingerprints"] and len(prev["files"]) < MAX_CHUNKS
+                and max([0] + [len(r) for r in rows]) <= prev["width"])
+    if appended:
+        return _append_sheet(cdir, fname, sheet, prev, fps, rows, cleaner) if rows else dict(prev)
+    if n_prev:
+        header, fps, rows = _read_rows(ws)
+    return _rebuild_sheet(cdir, fname, sheet, header, fps, rows, cleaner)
+
+
+def _ingest_worker(path, cdir, sheet, prev, fname, cleaner):
+    # Dijalankan di proses pool: buka workbook sendiri, kembalikan metadata saja (frame dibaca induk via mmap)
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        return _ingest_sheet(wb[sheet], cdir, sheet, prev, fname, cleaner)
+    finally:
+        wb.close()
+
+
+def _remove_stale(cdir, meta):
+    used = {f for info in meta["sheets"].values() for f in info["files"]}
+    for f in os.listdir(cdir):
+        if f.endswith(".arrow") and f not in used:
+            try:
+                os.remove(os.path.join(cdir, f))
+            except OSError:
+                pass  # masih di-memory-map proses lain (Windows), dihapus di refresh berikutnya
+
+
+# --- API UTAMA ---
+def load_workbook(path, sheets, cleaner=None, keep=True):
+    """Baca sheet workbook lewat cache kolomar. Saat file berubah hanya sheet
+    yang CRC-nya berubah yang di-stream ulang, dan jika perubahan berupa baris
+    baru di akhir sheet, hanya delta tersebut yang dibersihkan dan ditulis
+    sebagai chunk tambahan.
+
+    keep=False: frame tidak disimpan di memo proses (pemanggil menyimpan
+    bentuk lain, mis. kubus blok), baca berikutnya langsung dari file Arrow."""
+    frames = _load_workbook(path, sheets, cleaner)
+    if not keep:
+        with _lock:
+            for s in sheets:
+                _memo.pop((cache_dir_for(path), s), None)
+    return frames
+
+
+@contextmanager
+def _process_lock(cdir):
+    # Folder cache dipakai bersama proses lain (mis. report.py terjadwal di samping Streamlit):
+    # meta.json, nomor chunk & penghapusan chunk basi hanya boleh diubah satu proses sekaligus
+    os.makedirs(cdir, exist_ok=True)
+    with open(os.path.join(cdir, LOCK_FILE), "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK menyerah setelah ~10 detik; tunggu terus seperti flock
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _load_workbook(path, sheets, cleaner):
+    cdir = cache_dir_for(path)
+    with _lock:
+        dir_lock = _dir_locks[cdir]
+    with dir_lock, _process_lock(cdir):
+        key = file_key(path)
+        meta = _read_meta(cdir) or {"sheets": {}}
+        # Kunci dicek per sheet: sheet bisa dimuat terpisah (mode lazy), jadi kunci file saja tidak cukup
+        if any(meta["sheets"].get(s, {}).get("key") != key for s in sheets):
+            meta = _refresh(path, cdir, key, meta, sheets, cleaner)
+        try:
+            return {s: _frame_from_chunks(cdir, s, meta["sheets"][s]) for s in sheets}
+        except (OSError, pa.ArrowException):
+            # Cache rusak -> ingest ulang penuh
+            meta = _refresh(path, cdir, key, {"sheets": {}, "seq": meta.get("seq", 0)}, sheets, cleaner)
+            return {s: _frame_from_chunks(cdir, s, meta["sheets"][s]) for s in sheets}
+
+
+def _refresh(path, cdir, key, meta, sheets, cleaner):
+    os.makedirs(cdir, exist_ok=True)
+    crcs = sheet_crcs(path)
+    meta = {"key": key, "seq": meta.get("seq", 0), "sheets": dict(meta["sheets"])}
+    old = meta["sheets"]
+    changed = [s for s in sheets if s not in old or old[s].get("crc") != crcs[s]]
+    # Nama chunk dipesan di sini agar worker tidak perlu berbagi counter seq
+    jobs = {s: (old.get(s), _chunk_name(meta, s)) for s in changed}
+    infos = None
+    if len(jobs) > 1 and WORKERS > 1 and key["size"] >= PARALLEL_MIN_BYTES:
+        pool = _get_pool()
+        try:
+            futures = {s: pool.submit(_ingest_worker, path, cdir, s, prev, fname, cleaner) for s, (prev, fname) in jobs.items()}
+            infos = {s: f.result() for s, f in futures.items()}
+        except BrokenProcessPool:
+            # Batch ini di-parse ulang berurutan di bawah (nama chunk sama, ditimpa); refresh berikutnya pakai pool baru
+            _drop_pool(pool)
+            infos = None
+    if infos is None:
+        infos = {}
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True) if jobs else None
+        try:
+            for s, (prev, fname) in jobs.items():
+                infos[s] = _ingest_sheet(wb[s], cdir, s, prev, fname, cleaner)
+        finally:
+            if wb is not None: wb.close()
+    for s, info in infos.items():
+        info["crc"] = crcs[s]
+        old[s] = info
+    for s in sheets:
+        old[s]["key"] = key
+    _write_meta(cdir, meta)
+    _remove_stale(cdir, meta)
+    return meta
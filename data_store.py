@@ -0,0 +1,198 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import pandas as pd
+
+import compact
+import data_cache
+import db
+from timeseries import DateIndexed
+
+# --- KONFIGURASI WATCHER ---
+WATCH_INTERVAL = 2 # detik antar pengecekan file
+
+log = logging.getLogger(__name__)
+
+
+# --- LOADER (TANPA STREAMLIT) ---
+def read_master(path):
+    # Sheet dibaca dari cache kolomar; Excel hanya di-parse saat file berubah
+    frames = data_cache.load_workbook(path, data_cache.MASTER_SHEETS, data_cache.clean_master_sheet)
+    return tuple(frames[s] for s in data_cache.MASTER_SHEETS)
+
+
+def read_blok(path):
+    frames = data_cache.load_workbook(path, data_cache.BLOK_SHEETS)
+    return tuple(frames[s] for s in data_cache.BLOK_SHEETS)
+
+
+def load_data(path):
+    try:
+        return read_master(path)
+    except:
+        return tuple([pd.DataFrame()]*5)
+
+
+def load_data_blok(path):
+    try:
+        return read_blok(path)
+    except:
+        return tuple([pd.DataFrame()]*5)
+
+
+def read_sheets(path, sheets):
+    """Sebagian sheet satu workbook (master dibersihkan seperti read_master)."""
+    # Store menyimpan bentuk ringkasnya sendiri (DateIndexed / kubus blok), frame mentah tidak perlu ditahan di memo
+    cleaner = data_cache.clean_master_sheet if sheets[0] in data_cache.MASTER_SHEETS else None
+    return data_cache.load_workbook(path, sheets, cleaner, keep=False)
+
+
+def read_books(books, sheets, strict=True):
+    """Sheet terpilih dari beberapa workbook ({path: daftar sheet}); workbook dimuat bersamaan.
+    strict=False: workbook yang gagal dibaca menghasilkan DataFrame kosong (seperti load_data)."""
+    def read(path, wanted):
+        try:
+            return read_sheets(path, wanted)
+        except:
+            if strict: raise
+            return {s: pd.DataFrame() for s in wanted}
+
+    jobs = [(p, tuple(s for s in book if s in sheets)) for p, book in books.items()]
+    jobs = [(p, wanted) for p, wanted in jobs if wanted]
+    frames = {}
+    if len(jobs) > 1:
+        # Parse sheet sendiri sudah paralel di pool proses data_cache; thread ini hanya menunggu hasilnya
+        with ThreadPoolExecutor(max_workers=len(jobs)) as ex:
+            for result in ex.map(lambda job: read(*job), jobs):
+                frames.update(result)
+    else:
+        for p, wanted in jobs:
+            frames.update(read(p, wanted))
+    return frames
+
+
+def build_series(master):
+    return {s: DateIndexed(df) for s, df in zip(data_cache.MASTER_SHEETS, master)}
+
+
+def _file_state(path):
+    try:
+        st_ = os.stat(path)
+        return st_.st_size, st_.st_mtime
+    except OSError:
+        return None
+
+
+# --- SNAPSHOT & STORE ---
+@dataclass(frozen=True)
+class Snapshot:
+    """Data satu versi. Dibagi ke semua sesi, jadi frame di dalamnya
+    tidak boleh diubah in-place (selalu .copy() dulu)."""
+    version: int
+    series: dict # nama sheet master -> DateIndexed (terurut, tipe ringkas; mode lazy: hanya sheet yang sudah diminta)
+    cube: compact.BlokCube = None # kelima sheet blok dalam satu kubus ringkas (None = belum dimuat)
+
+    def has(self, sheet):
+        if sheet in data_cache.BLOK_SHEETS:
+            return self.cube is not None
+        return sheet in self.series
+
+
+class DataStore:
+    """Store data bersama satu proses. Satu thread watcher memantau kedua
+    workbook, memuat ulang sekali saat berubah, lalu menaikkan versi.
+
+    Dengan lazy=True sheet baru dibaca saat pertama kali diminta lewat
+    require() (mis. saat tab yang membutuhkannya dibuka), bukan saat start."""
+
+    def __init__(self, master_path, blok_path, db_path=db.DB_PATH, interval=WATCH_INTERVAL, lazy=False):
+        self.master_path = master_path
+        self.blok_path = blok_path
+        self.db_path = db_path
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._books = {master_path: data_cache.MASTER_SHEETS, blok_path: data_cache.BLOK_SHEETS}
+        self._states = {master_path: _file_state(master_path), blok_path: _file_state(blok_path)}
+        db.ensure_schema(db_path)
+        self._snapshot = Snapshot(1, {})
+        if not lazy:
+            self.require(*data_cache.MASTER_SHEETS, *data_cache.BLOK_SHEETS)
+        self._thread = threading.Thread(target=self._watch, name="data-watcher", daemon=True)
+        self._thread.start()
+
+    def snapshot(self):
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def require(self, *sheets):
+        """Snapshot versi saat ini yang dijamin memuat sheet yang diminta."""
+        if all(self._snapshot.has(s) for s in sheets):
+            return self._snapshot
+        with self._lock:
+            snap = self._snapshot
+            missing = [s for s in sheets if not snap.has(s)]
+            if any(s in data_cache.BLOK_SHEETS for s in missing):
+                # Kubus blok dibangun dari kelima sheet sekaligus
+                missing = [s for s in missing if s not in data_cache.BLOK_SHEETS] + list(data_cache.BLOK_SHEETS)
+            if missing:
+                frames = self._read(missing, strict=False)
+                self._snapshot = self._publish(snap, snap.version, frames)
+            return self._snapshot
+
+    def _read(self, sheets, strict=True):
+        return read_books(self._books, sheets, strict)
+
+    def _publish(self, snap, version, frames):
+        master = {s: df for s, df in frames.items() if s in data_cache.MASTER_SHEETS}
+        blok = {s: df for s, df in frames.items() if s in data_cache.BLOK_SHEETS}
+        if blok:
+            self._sync(blok)
+        # Yang disimpan snapshot hanya satu salinan ringkas per sheet: DateIndexed di atas frame master
+        # yang sudah di-downcast, dan kubus blok; frame mentah hasil baca tidak ditahan (keep=False)
+        series = dict(snap.series)
+        series.update({s: DateIndexed(compact.compact_frame(df)) for s, df in master.items()})
+        cube = compact.BlokCube.from_frames(blok) if blok else snap.cube
+        return Snapshot(version, series, cube)
+
+    def _sync(self, blok):
+        # Sheet blok dicerminkan ke blok_bulanan + rollup (dilewati jika file sudah pernah disinkron);
+        # sheet master tidak perlu: semua query hariannya dilayani DateIndexed di snapshot
+        frames = tuple(blok.get(s) for s in data_cache.BLOK_SHEETS)
+        if all(f is not None for f in frames) and not frames[0].empty:
+            db.sync_blok(self.blok_path, frames, self.db_path)
+
+    def _watch(self):
+        last_error = None
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+                last_error = None
+            except Exception as e:
+                # File sedang disimpan Excel, sheet diganti nama, file rusak, dst -> state tidak diperbarui,
+                # coba lagi di tick berikutnya. Dicatat sekali per error agar log tidak terisi tiap 2 detik
+                if repr(e) != last_error:
+                    log.exception("Gagal memuat ulang workbook, dicoba lagi tiap %s detik", self.interval)
+                    last_error = repr(e)
+
+    def check(self):
+        """Muat ulang sheet (yang sudah dimuat) dari workbook yang berubah sejak pengecekan terakhir."""
+        states = {p: _file_state(p) for p in self._states}
+        changed = [p for p in states if states[p] != self._states[p]]
+        if not changed:
+            return False
+        with self._lock:
+            snap = self._snapshot
+            loaded = [s for p in changed for s in self._books[p] if snap.has(s)]
+            # DB diperbarui (di _publish) sebelum versi naik, agar query sesi melihat data versi baru
+            if loaded:
+                self._snapshot = self._publish(snap, snap.version + 1, self._read(loaded))
+            self._states.update(states)
+        return bool(loaded)
@@ -0,0 +1,167 @@
+import sqlite3
+from contextlib import closing, contextmanager
+
+import pandas as pd
+
+import data_cache
+
+# --- KONFIGURASI DATABASE ---
+DB_PATH = "kebun_sawit.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transaksi_panen (
+    "Date" TIMESTAMP,
+    "Blok Name" TEXT,
+    "Blok SAP" INTEGER,
+    "Div Code" TEXT,
+    "Jumlah TBS" INTEGER,
+    "Brondolan" INTEGER,
+    "Estimasi Tonase" REAL
+);
+CREATE INDEX IF NOT EXISTS idx_panen_date ON transaksi_panen ("Date");
+CREATE INDEX IF NOT EXISTS idx_panen_div_date ON transaksi_panen ("Div Code", "Date");
+CREATE INDEX IF NOT EXISTS idx_panen_blok_date ON transaksi_panen ("Blok SAP", "Date");
+
+-- Sheet blok (tbs/tonase/yph/brondol/bjr) dalam bentuk panjang, hanya sel berisi
+CREATE TABLE IF NOT EXISTS blok_bulanan (
+    metrik TEXT, afd TEXT, blok TEXT, ha REAL, bulan TEXT, nilai REAL
+);
+CREATE INDEX IF NOT EXISTS idx_blok_bulanan_metrik ON blok_bulanan (metrik, bulan);
+CREATE INDEX IF NOT EXISTS idx_blok_bulanan_blok ON blok_bulanan (metrik, blok, bulan);
+
+-- Workbook yang terakhir dicerminkan (kunci = ukuran + mtime file)
+CREATE TABLE IF NOT EXISTS sinkron_workbook (
+    path TEXT PRIMARY KEY, size INTEGER, mtime REAL
+);
+
+-- Rollup siap pakai untuk tab Summary Blok (dari sel workbook): per blok, per afdeling (+ ESTATE), per bulan
+CREATE TABLE IF NOT EXISTS rollup_blok (
+    afd TEXT, blok TEXT, bulan TEXT, ha REAL, tbs REAL, tonase REAL, brondol REAL, yph REAL, bjr REAL
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_blok ON rollup_blok (bulan, blok);
+CREATE INDEX IF NOT EXISTS idx_rollup_blok_blok ON rollup_blok (blok, bulan);
+CREATE TABLE IF NOT EXISTS rollup_afd (
+    afd TEXT, bulan TEXT, ha REAL, tbs REAL, tonase REAL, brondol REAL, yph REAL, bjr REAL
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_afd ON rollup_afd (afd, bulan);
+
+-- Penanda versi rollup, naik setiap kali rollup diperbarui (dipakai sebagai kunci cache tampilan)
+CREATE TABLE IF NOT EXISTS versi_rollup (id INTEGER PRIMARY KEY CHECK (id = 1), versi INTEGER NOT NULL);
+"""
+
+
+# --- KONEKSI ---
+@contextmanager
+def connect(path=DB_PATH):
+    # Satu koneksi per pemanggilan: aman dipakai dari thread sesi mana pun
+    with closing(sqlite3.connect(path, timeout=30)) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            yield conn
+
+
+def ensure_schema(path=DB_PATH):
+    with connect(path) as conn:
+        conn.executescript(SCHEMA)
+
+
+def _ts(value):
+    return pd.Timestamp(value).strftime('%Y-%m-%d %H:%M:%S')
+
+
+# --- ROLLUP BULANAN ---
+REFRESH_ROLLUP = """
+DELETE FROM rollup_blok WHERE bulan IN (SELECT bulan FROM temp.bulan_refresh);
+INSERT INTO rollup_blok
+SELECT afd, blok, bulan, MAX(ha),
+       SUM(CASE metrik WHEN 'tbs' THEN nilai END), SUM(CASE metrik WHEN 'tonase' THEN nilai END),
+       SUM(CASE metrik WHEN 'brondol' THEN nilai END), SUM(CASE metrik WHEN 'yph' THEN nilai END),
+       SUM(CASE metrik WHEN 'bjr' THEN nilai END)
+FROM blok_bulanan WHERE bulan IN (SELECT bulan FROM temp.bulan_refresh)
+GROUP BY afd, blok, bulan;
+
+DELETE FROM rollup_afd WHERE bulan IN (SELECT bulan FROM temp.bulan_refresh);
+INSERT INTO rollup_afd
+SELECT afd, bulan, SUM(ha), SUM(tbs), SUM(tonase), SUM(brondol),
+       SUM(tonase) / 1000.0 / NULLIF(SUM(CASE WHEN tonase IS NOT NULL THEN ha END), 0), SUM(tonase) / NULLIF(SUM(tbs), 0)
+FROM rollup_blok WHERE bulan IN (SELECT bulan FROM temp.bulan_refresh) GROUP BY afd, bulan
+UNION ALL
+SELECT 'ESTATE', bulan, SUM(ha), SUM(tbs), SUM(tonase), SUM(brondol),
+       SUM(tonase) / 1000.0 / NULLIF(SUM(CASE WHEN tonase IS NOT NULL THEN ha END), 0), SUM(tonase) / NULLIF(SUM(tbs), 0)
+FROM rollup_blok WHERE bulan IN (SELECT bulan FROM temp.bulan_refresh) GROUP BY bulan;
+"""
+
+
+def refresh_rollup(conn, months=None):
+    """Perbarui rollup untuk bulan tertentu ('YYYY-MM-01'); None = semua bulan."""
+    if months is None:
+        months = {r[0] for r in conn.execute("SELECT DISTINCT bulan FROM blok_bulanan")}
+    months = sorted(months)
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS bulan_refresh (bulan TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.bulan_refresh")
+    conn.executemany("INSERT INTO temp.bulan_refresh VALUES (?)", [(m,) for m in months])
+    for stmt in REFRESH_ROLLUP.split(";"):
+        if stmt.strip(): conn.execute(stmt)
+    conn.execute("INSERT INTO versi_rollup VALUES (1, 1) ON CONFLICT(id) DO UPDATE SET versi = versi + 1")
+
+
+# --- SINKRON WORKBOOK -> SQLITE ---
+def _synced(conn, key):
+    row = conn.execute("SELECT size, mtime FROM sinkron_workbook WHERE path = ?", (key["path"],)).fetchone()
+    return row == (key["size"], key["mtime"])
+
+
+def _mark_synced(conn, key):
+    conn.execute("INSERT OR REPLACE INTO sinkron_workbook VALUES (?, ?, ?)", (key["path"], key["size"], key["mtime"]))
+
+
+def sync_blok(path, frames, db_path=DB_PATH):
+    """Cerminkan sheet blok (lebar, satu kolom per bulan) ke tabel panjang blok_bulanan."""
+    key = data_cache.file_key(path)
+    with connect(db_path) as conn:
+        if _synced(conn, key):
+            return False
+        months = {r[0] for r in conn.execute("SELECT DISTINCT bulan FROM blok_bulanan")}
+        conn.execute("DELETE FROM blok_bulanan")
+        for metrik, df in zip(data_cache.BLOK_SHEETS, frames):
+            bulan = [c for c in df.columns if isinstance(c, pd.Timestamp)]
+            if df.empty or not bulan:
+                continue
+            long = df.melt(id_vars=["AFD", "BLOK", "HA"], value_vars=bulan, var_name="bulan", value_name="nilai")
+            long = long.dropna(subset=["BLOK", "nilai"])
+            long["nilai"] = pd.to_numeric(long["nilai"], errors="coerce")
+            conn.executemany(
+                "INSERT INTO blok_bulanan VALUES (?, ?, ?, ?, ?, ?)",
+                zip([metrik] * len(long), long["AFD"], long["BLOK"], long["HA"],
+                    pd.to_datetime(long["bulan"]).dt.strftime('%Y-%m-%d'), long["nilai"]))
+        # Rollup cukup dihitung ulang untuk bulan yang ada di workbook lama/baru
+        months |= {r[0] for r in conn.execute("SELECT DISTINCT bulan FROM blok_bulanan")}
+        refresh_rollup(conn, months)
+        _mark_synced(conn, key)
+    return True
+
+
+# --- QUERY ---
+def rollup_version(db_path=DB_PATH):
+    """Nomor versi rollup; berubah setiap sinkron workbook blok."""
+    with connect(db_path) as conn:
+        row = conn.execute("SELECT versi FROM versi_rollup WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+
+def rollup_bulanan(afd="ESTATE", db_path=DB_PATH):
+    """Rollup bulanan TBS, tonase (kg), brondolan, YPH & BJR untuk satu afdeling atau ESTATE."""
+    with connect(db_path) as conn:
+        df = pd.read_sql_query("SELECT * FROM rollup_afd WHERE afd = ? ORDER BY bulan", conn, params=(afd,))
+    df['bulan'] = pd.to_datetime(df['bulan'])
+    return df
+
+
+def iter_transaksi(start, end, chunksize=50_000, db_path=DB_PATH):
+    """Transaksi panen tanggal [start, end] (sampai akhir hari end) sebagai potongan DataFrame."""
+    end_excl = _ts(pd.Timestamp(end).normalize() + pd.Timedelta(days=1))
+    with connect(db_path) as conn:
+        for df in pd.read_sql_query('SELECT * FROM transaksi_panen WHERE "Date" >= ? AND "Date" < ? ORDER BY "Date"',
+                                    conn, params=(_ts(start), end_excl), chunksize=chunksize):
+            df['Date'] = pd.to_datetime(df['Date'])
+            yield df
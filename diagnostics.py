@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+# --- KONFIGURASI DIAGNOSTIK ---
+ENV_VAR = "DASHBOARD_DIAG" # DASHBOARD_DIAG=1 -> aktif untuk semua sesi; atau buka dashboard dengan ?diag=1
+LOG_PATH = os.path.join("logs", "diagnostik.log")
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 5
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def env_enabled():
+    return os.environ.get(ENV_VAR, "").lower() in ("1", "true", "yes")
+
+
+def get_logger(path=LOG_PATH):
+    """Logger JSON-per-baris dengan file berputar (dipasang sekali per proses)."""
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            logger = logging.getLogger("dashboard.diagnostik")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            _logger = logger
+        return _logger
+
+
+class _Noop:
+    # Dipakai saat diagnostik mati: satu objek bersama, tanpa alokasi & tanpa timer
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _Noop()
+
+
+class _Stage:
+    def __init__(self, rec, name):
+        self.rec, self.name = rec, name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.rec.add(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+class Recorder:
+    """Pencatat satu rerun: durasi per tahap, hit/miss cache, ukuran frame.
+
+    Saat enabled=False semua method langsung kembali, jadi instrumentasi
+    boleh tetap terpasang di hot path."""
+
+    def __init__(self, enabled=False, cache=None):
+        self.enabled = enabled
+        self.cache = cache
+        if not enabled:
+            return
+        self.t0 = time.perf_counter()
+        self.stages = {} # nama -> [total detik, jumlah panggilan]
+        self.frames = {} # nama -> (baris, kolom, byte)
+        self.cache_start = cache.stats() if cache is not None else None
+
+    def stage(self, name):
+        return _Stage(self, name) if self.enabled else _NOOP
+
+    def add(self, name, seconds):
+        total = self.stages.setdefault(name, [0.0, 0])
+        total[0] += seconds
+        total[1] += 1
+
+    def timed(self, name, fn):
+        """Bungkus builder (mis. untuk RenderCache.get) agar waktunya tercatat hanya saat benar-benar dibangun."""
+        if not self.enabled:
+            return fn
+        def run():
+            with self.stage(name):
+                return fn()
+        return run
+
+    def frame(self, name, df):
+        if self.enabled and df is not None:
+            self.frames[name] = (len(df), len(df.columns), int(df.memory_usage(deep=False).sum()))
+
+    def finish(self, **context):
+        """Tutup rerun: ringkasan dict (None jika mati) yang juga ditulis ke log berputar."""
+        if not self.enabled:
+            return None
+        summary = {
+            "waktu": time.strftime("%Y-%m-%d %H:%M:%S"),
+            **context,
+            "total_ms": round((time.perf_counter() - self.t0) * 1000, 2),
+            "tahap": {k: {"ms": round(v[0] * 1000, 2), "n": v[1]} for k, v in self.stages.items()},
+            "frame": {k: {"baris": r, "kolom": c, "byte": b} for k, (r, c, b) in self.frames.items()},
+        }
+        if self.cache_start is not None:
+            now = self.cache.stats()
+            summary["cache"] = {"hit": now["hits"] - self.cache_start["hits"], "miss": now["misses"] - self.cache_start["misses"],
+                                "item": now["items"], "byte": now["bytes"]}
+        try:
+            get_logger().info(json.dumps(summary, default=str))
+        except OSError:
+            pass  # folder log tidak bisa ditulis -> panel tetap tampil
+        return summary
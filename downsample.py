@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+# --- KONFIGURASI RESOLUSI GRAFIK ---
+POINT_BUDGET = 120 # titik maksimum per trace (ringan untuk browser HP)
+
+# Urutan resolusi yang dicoba: (label, aturan resample pandas, format tick sumbu x)
+LEVELS = [
+    ("Mingguan", "W-MON", "%d/%m/%y"),
+    ("Bulanan", "MS", "%b %Y"),
+]
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: pilih n_out titik yang mempertahankan bentuk kurva."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    xf = x.astype(float)
+    yf = np.nan_to_num(y.astype(float))
+    every = (n - 2) / (n_out - 2)
+    idx, a = [0], 0
+    for i in range(n_out - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        nxt_end = min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = xf[end:nxt_end].mean(), yf[end:nxt_end].mean()
+        area = np.abs((xf[a] - avg_x) * (yf[start:end] - yf[a]) - (xf[a] - xf[start:end]) * (avg_y - yf[a]))
+        a = start + int(area.argmax())
+        idx.append(a)
+    idx.append(n - 1)
+    return np.array(idx)
+
+
+def downsample(dates, values, agg="sum", max_points=POINT_BUDGET):
+    """Sesuaikan resolusi deret harian dengan rentang & anggaran titik.
+
+    Mengembalikan (x, y, label, tickformat). Harian jika muat, lalu agregasi
+    mingguan/bulanan (sum untuk produksi, mean untuk persen), dan LTTB jika
+    versi bulanan pun masih melebihi anggaran."""
+    s = pd.Series(pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(), index=pd.DatetimeIndex(dates))
+    if len(s) <= max_points:
+        return s.index, s.to_numpy(), "Harian", "%d/%m"
+    for label, rule, fmt in LEVELS:
+        r = s.resample(rule)
+        s_agg = r.sum(min_count=1) if agg == "sum" else r.mean()
+        if len(s_agg) <= max_points:
+            return s_agg.index, s_agg.to_numpy(), label, fmt
+    keep = lttb(s_agg.index.asi8, s_agg.to_numpy(), max_points)
+    return s_agg.index[keep], s_agg.to_numpy()[keep], f"{label} (LTTB)", fmt
@@ -0,0 +1,137 @@
+import io
+import tempfile
+
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import data_cache
+import db
+
+# --- KONFIGURASI EKSPOR ---
+CHUNK_ROWS = 20_000 # baris per potongan; memori ekspor tidak tumbuh mengikuti panjang histori
+SPOOL_BYTES = 16 * 1024 * 1024 # di atas ini file hasil pindah ke disk sementara
+
+# format -> (mime, ekstensi)
+FORMATS = {
+    "CSV": ("text/csv", "csv"),
+    "Parquet": ("application/vnd.apache.parquet", "parquet"),
+    "XLSX": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+TRANSAKSI = "Transaksi Panen"
+DATASETS = list(data_cache.MASTER_SHEETS) + list(data_cache.BLOK_SHEETS) + [TRANSAKSI]
+
+
+# --- SUMBER DATA (GENERATOR POTONGAN) ---
+def _sheet_chunks(series, start, end):
+    # Sheet harian: jendela [start, end] via binary search, dipotong per CHUNK_ROWS
+    lo, hi = series.bounds(start, end)
+    for i in range(lo, max(hi, lo + 1), CHUNK_ROWS): # rentang kosong tetap menghasilkan header
+        j = min(i + CHUNK_ROWS, hi)
+        chunk = series.frame.iloc[i:j].drop(columns=['Tgl'])
+        chunk.insert(0, 'Tanggal', series.dates[i:j])
+        yield chunk
+
+
+def _blok_chunks(df, start, end):
+    # Sheet blok: satu baris per blok, rentang tanggal memilih kolom bulan
+    if df.empty:
+        return
+    first = pd.Timestamp(start).replace(day=1)
+    cols = [c for c in df.columns if not isinstance(c, pd.Timestamp) or first <= c <= pd.Timestamp(end)]
+    out = df[cols].rename(columns=lambda c: c.strftime('%Y-%m') if isinstance(c, pd.Timestamp) else c)
+    for i in range(0, len(out), CHUNK_ROWS):
+        yield out.iloc[i:i + CHUNK_ROWS]
+
+
+def needs(dataset):
+    """Sheet yang harus dimuat DataStore sebelum dataset ini bisa diekspor."""
+    return () if dataset == TRANSAKSI else (dataset,)
+
+
+def iter_chunks(dataset, snap, start, end):
+    """Potongan DataFrame satu dataset untuk rentang tanggal [start, end] (inklusif)."""
+    if dataset == TRANSAKSI:
+        return db.iter_transaksi(start, end, chunksize=CHUNK_ROWS)
+    if dataset in data_cache.BLOK_SHEETS:
+        return _blok_chunks(snap.cube.wide(dataset), start, end)
+    return _sheet_chunks(snap.series[dataset], start, end)
+
+
+# --- PENULIS PER FORMAT ---
+def _write_csv(chunks, out):
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='', write_through=True)
+    header = True
+    for chunk in chunks:
+        chunk.to_csv(text, index=False, header=header)
+        header = False
+    text.detach()
+
+
+def _arrow_table(chunk, schema=None):
+    chunk = chunk.rename(columns=str)
+    for col in chunk.columns:
+        if chunk[col].dtype == object and pd.api.types.infer_dtype(chunk[col], skipna=True).startswith("mixed"):
+            chunk[col] = chunk[col].where(chunk[col].isna(), chunk[col].astype(str))
+    table = pa.Table.from_pandas(chunk, preserve_index=False)
+    if schema is not None and table.schema != schema:
+        table = table.cast(schema)
+    return table
+
+
+def _write_parquet(chunks, out):
+    writer = None
+    try:
+        for chunk in chunks:
+            table = _arrow_table(chunk, writer.schema if writer else None)
+            if writer is None:
+                writer = pq.ParquetWriter(out, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write_xlsx(chunks, out, sheet_name):
+    # Mode write-only: baris langsung dialirkan ke file sementara openpyxl, bukan disimpan di memori
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name[:31])
+    header = True
+    for chunk in chunks:
+        if header:
+            ws.append([str(c) for c in chunk.columns])
+            header = False
+        values = chunk.astype(object).to_numpy()
+        values[pd.isna(values)] = None
+        for row in values:
+            ws.append([v.to_pydatetime() if isinstance(v, pd.Timestamp) else v for v in row])
+    wb.save(out)
+
+
+def export(dataset, fmt, snap, start, end):
+    """Isi file ekspor (bytes) untuk dataset & rentang tanggal terpilih.
+
+    Dibangun hanya saat tombol download diklik. Data dibaca & ditulis per
+    potongan ke SpooledTemporaryFile, tetapi file jadinya dikembalikan utuh
+    sebagai bytes (download_button tetap menyimpan seluruh isinya), jadi
+    memori puncak sebanding ukuran file ekspor."""
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    chunks = iter_chunks(dataset, snap, start, end)
+    if fmt == "CSV":
+        _write_csv(chunks, out)
+    elif fmt == "Parquet":
+        _write_parquet(chunks, out)
+    elif fmt == "XLSX":
+        _write_xlsx(chunks, out, dataset)
+    else:
+        raise ValueError(f"Format ekspor tidak dikenal: {fmt}")
+    with out:
+        out.seek(0)
+        return out.read()
+
+
+def file_name(dataset, fmt, start, end):
+    slug = dataset.lower().replace(' & ', '_').replace(' ', '_')
+    return f"{slug}_{pd.Timestamp(start):%Y%m%d}_{pd.Timestamp(end):%Y%m%d}.{FORMATS[fmt][1]}"
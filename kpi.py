@@ -0,0 +1,136 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# --- ATURAN AGREGASI KOLOM ---
+# Kolom yang namanya mengandung salah satu penanda ini dijumlah, kolom persen/TK dirata-rata
+SUM_MARKERS = ('(J)', 'AKTUAL', 'AKP', 'RESTAN', 'TOTAL', 'CURAH', 'LUAS')
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    """Klasifikasi kolom tabel: dijumlah, dirata-rata, atau dilewati (NA)."""
+    columns: tuple
+    sum_cols: tuple
+    mean_cols: tuple
+
+
+@lru_cache(maxsize=64)
+def table_schema(columns, extra_sum_cols=()):
+    """Klasifikasi dihitung sekali per susunan kolom (praktis sekali per load data)."""
+    sum_cols, mean_cols = [], []
+    for col in columns:
+        if col == 'Tgl': continue
+        if any(x in col.upper() for x in SUM_MARKERS) or col in extra_sum_cols:
+            sum_cols.append(col)
+        elif '%' in col or 'TK' in col.upper():
+            mean_cols.append(col)
+    return TableSchema(tuple(columns), tuple(sum_cols), tuple(mean_cols))
+
+
+def _numeric(df, cols):
+    # Satu matriks float untuk semua kolom sekaligus; kolom non-numerik dikonversi sekali
+    block = df[list(cols)]
+    if not all(pd.api.types.is_numeric_dtype(t) for t in block.dtypes):
+        block = block.apply(pd.to_numeric, errors='coerce')
+    return block.to_numpy(dtype=float, na_value=np.nan)
+
+
+def _sum_mean(values):
+    valid = ~np.isnan(values)
+    sums = np.where(valid, values, 0.0).sum(axis=0)
+    counts = valid.sum(axis=0)
+    means = np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+    return sums, means
+
+
+def summary_row(df, label="TOTAL", current_afd_cols=()):
+    """Baris TOTAL (satu baris, kolom sama dengan df) tanpa menyalin tabel aslinya."""
+    if df.empty: return None
+    schema = table_schema(tuple(df.columns), tuple(current_afd_cols))
+    row = {c: pd.NA for c in schema.columns}
+    row['Tgl'] = label
+    cols = schema.sum_cols + schema.mean_cols
+    if cols:
+        sums, means = _sum_mean(_numeric(df, cols))
+        n = len(schema.sum_cols)
+        row.update(zip(schema.sum_cols, sums[:n]))
+        row.update(zip(schema.mean_cols, means[n:]))
+    return pd.DataFrame([row], columns=list(schema.columns))
+
+
+# --- KPI DASHBOARD UTAMA ---
+@dataclass(frozen=True)
+class KpiColumns:
+    curah: str | None
+    tk_panen: str | None
+    budget: str | None
+    bbc: str | None
+
+
+@lru_cache(maxsize=16)
+def kpi_columns(dash_columns, bb_columns=()):
+    """Cari kolom curah hujan, TK panen, budget & BBC sekali per susunan kolom."""
+    curah = next((c for c in dash_columns if 'curah' in c.lower()), None)
+    tk = next((c for c in dash_columns if 'tk' in c.lower() and 'panen' in c.lower()), None)
+    budget = next((c for c in bb_columns if 'budget' in c.lower()), None)
+    bbc = next((c for c in bb_columns if 'bbc' in c.lower()), None)
+    return KpiColumns(curah, tk, budget, bbc)
+
+
+def dashboard_kpis(f_dash, f_mentah, f_mengkal, cols, prod_mtd=0, total_budget=0, total_bbc=0):
+    """Semua KPI Tab 1 dalam satu lintasan NumPy per tabel."""
+    dash_cols = ["Aktual Produksi", "AKP"] + [c for c in (cols.curah, cols.tk_panen) if c]
+    sums, means = _sum_mean(_numeric(f_dash, dash_cols)) if not f_dash.empty else (np.zeros(len(dash_cols)), np.full(len(dash_cols), np.nan))
+    by_col = dict(zip(dash_cols, zip(sums, means)))
+
+    def estate_mean(df):
+        return _sum_mean(_numeric(df, ["ESTATE %"]))[1][0] if not df.empty else 0
+
+    return {
+        "prod": by_col["Aktual Produksi"][0],
+        "akp": by_col["AKP"][0],
+        "pct_budget": prod_mtd / total_budget * 100 if total_budget > 0 else 0,
+        "pct_bbc": prod_mtd / total_bbc * 100 if total_bbc > 0 else 0,
+        "mentah": estate_mean(f_mentah),
+        "mengkal": estate_mean(f_mengkal),
+        "curah": by_col[cols.curah][0] if cols.curah else 0,
+        "tk_panen": by_col[cols.tk_panen][1] if cols.tk_panen else 0,
+    }
+
+
+# --- KPI PER AFDELING ---
+AFD_PATTERN = re.compile(r'^Afd(?:eling)?\s+(\S+)\s')
+
+
+@dataclass(frozen=True)
+class AfdColumns:
+    afd: str
+    prod: str | None
+    grading: str | None
+
+
+@lru_cache(maxsize=16)
+def afdeling_columns(prod_columns, grading_columns=()):
+    """Pasangkan kolom 'Afdeling A (Ton)' (Prod Afd) dengan 'Afd A %' (grading) per afdeling."""
+    prod = {m.group(1): c for c in prod_columns if (m := AFD_PATTERN.match(c)) and '(Ton)' in c}
+    grading = {m.group(1): c for c in grading_columns if (m := AFD_PATTERN.match(c)) and '%' in c}
+    return tuple(AfdColumns(a, prod.get(a), grading.get(a)) for a in sorted(prod.keys() | grading.keys()))
+
+
+def afdeling_kpis(f_prod, f_mentah, f_mengkal, cols):
+    """Produksi, mentah & mengkal semua afdeling sekaligus: satu matriks per tabel, bukan loop per afdeling."""
+    def column_stats(df, names, pick):
+        names = [c for c in names if c and c in df.columns]
+        if df.empty or not names:
+            return {}
+        return dict(zip(names, _sum_mean(_numeric(df, names))[pick]))
+
+    prod = column_stats(f_prod, [c.prod for c in cols], 0)
+    mentah = column_stats(f_mentah, [c.grading for c in cols], 1)
+    mengkal = column_stats(f_mengkal, [c.grading for c in cols], 1)
+    return {c.afd: {"prod": prod.get(c.prod, 0), "mentah": mentah.get(c.grading, 0), "mengkal": mengkal.get(c.grading, 0)}
+            for c in cols}
@@ -1,18 +1,114 @@
-import pandas as pd
+import argparse
+import os
 import sqlite3
+import time
+
+import openpyxl
+import pandas as pd
+
+import db
+
+# --- KONFIGURASI LOADER ---
+CHUNK_SIZE = 50_000 # baris per transaksi
+KOLOM = ["Date", "Blok Name", "Blok SAP", "Div Code", "Jumlah TBS", "Brondolan", "Estimasi Tonase"]
+UNIQUE_INDEX = "ux_panen_date_blok" # kunci natural upsert
+
+UPSERT = f"""
+    INSERT INTO transaksi_panen ({', '.join(f'"{k}"' for k in KOLOM)})
+    VALUES ({', '.join('?' * len(KOLOM))})
+    ON CONFLICT ("Date", "Blok SAP") DO UPDATE SET
+    {', '.join(f'"{k}" = excluded."{k}"' for k in KOLOM if k not in ("Date", "Blok SAP"))}
+"""
+
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-200000", # ~200 MB page cache
+]
+
+
+# --- SUMBER DATA (DIBACA BERTAHAP) ---
+def iter_chunks(path, chunk_size=CHUNK_SIZE):
+    """Hasilkan DataFrame per chunk dari .xlsx (openpyxl read-only) atau .csv."""
+    if path.lower().endswith(".csv"):
+        yield from pd.read_csv(path, chunksize=chunk_size)
+        return
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = list(next(rows))
+        buf = []
+        for row in rows:
+            if all(v is None for v in row): continue
+            buf.append(row)
+            if len(buf) >= chunk_size:
+                yield pd.DataFrame(buf, columns=header)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=header)
+    finally:
+        wb.close()
+
+
+def normalize(df):
+    # Pastikan kolom Date dalam format yang sama dengan data lama ('YYYY-MM-DD HH:MM:SS')
+    missing = [k for k in KOLOM if k not in df.columns]
+    if missing:
+        raise ValueError(f"Kolom tidak ditemukan: {', '.join(missing)}")
+    df = df[KOLOM].copy()
+    df["Date"] = pd.to_datetime(df["Date"]).dt.strftime('%Y-%m-%d %H:%M:%S')
+    df = df.dropna(subset=["Date", "Blok SAP"])
+    return df.astype(object).where(df.notna(), None)
+
+
+# --- LOADER ---
+def prepare(conn):
+    for p in PRAGMAS:
+        conn.execute(p)
+    conn.executescript(db.SCHEMA)
+    # Kunci natural (Date, Blok SAP): duplikat dari impor lama dibuang sekali, sebelum index unik dibuat.
+    # Setelah index ada, tabel dijamin bebas duplikat -> scan + GROUP BY penuh tidak perlu diulang
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (UNIQUE_INDEX,)).fetchone() is None:
+        conn.execute("""DELETE FROM transaksi_panen WHERE rowid NOT IN
+                        (SELECT MAX(rowid) FROM transaksi_panen GROUP BY "Date", "Blok SAP")""")
+        conn.execute(f'CREATE UNIQUE INDEX {UNIQUE_INDEX} ON transaksi_panen ("Date", "Blok SAP")')
+    conn.commit()
+
+
+def load(path, db_path=db.DB_PATH, chunk_size=CHUNK_SIZE):
+    conn = sqlite3.connect(db_path)
+    try:
+        prepare(conn)
+        total, t0 = 0, time.perf_counter()
+        for chunk in iter_chunks(path, chunk_size):
+            rows = normalize(chunk)
+            with conn: # satu transaksi per chunk
+                conn.executemany(UPSERT, rows.itertuples(index=False, name=None))
+            total += len(rows)
+            elapsed = time.perf_counter() - t0
+            print(f"   {total:,} baris ({total / elapsed:,.0f} baris/detik)")
+        return total, time.perf_counter() - t0
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Muat transaksi panen (Excel/CSV) ke kebun_sawit.db")
+    parser.add_argument("file", nargs="?", default="data_panen_30rb.xlsx")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    try:
+        if not os.path.exists(args.file):
+            raise FileNotFoundError(f"File {args.file} tidak ditemukan")
+        total, elapsed = load(args.file, args.db, args.chunk)
+        print(f"✅ Berhasil! {total:,} data telah masuk ke database "
+              f"dalam {elapsed:.1f} detik ({total / max(elapsed, 1e-9):,.0f} baris/detik).")
+    except Exception as e:
+        print(f"❌ Terjadi kesalahan: {e}")
+
 
-# 1. Load Excel (Pastikan file Anda bernama data_panen_30rb.xlsx)
-try:
-    df = pd.read_excel('data_panen_30rb.xlsx')
-    
-    # 2. Pembersihan Data (Pastikan kolom Date dalam format yang benar)
-    df['Date'] = pd.to_datetime(df['Date'])
-    
-    # 3. Simpan ke SQLite
-    conn = sqlite3.connect('kebun_sawit.db')
-    df.to_sql('transaksi_panen', conn, if_exists='append', index=False)
-    conn.close()
-    
-    print(f"✅ Berhasil! {len(df)} data telah masuk ke database.")
-except Exception as e:
-    print(f"❌ Terjadi kesalahan: {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.graph_objects as go
+
+# --- KONFIGURASI CACHE RENDER ---
+MAX_BYTES = 64 * 1024 * 1024 # batas memori seluruh entri
+MAX_ITEMS = 512
+
+
+def estimate_size(value):
+    """Perkiraan ukuran memori entri (cukup untuk keputusan eviksi, bukan angka pasti)."""
+    if isinstance(value, tuple):
+        return sum(estimate_size(v) for v in value)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum()) if isinstance(value, pd.DataFrame) else int(value.memory_usage(deep=True))
+    if isinstance(value, go.Figure):
+        points = sum(len(v) for t in value.data for v in (getattr(t, 'x', None), getattr(t, 'y', None)) if v is not None)
+        return 4096 + points * 16
+    return 1024
+
+
+class RenderCache:
+    """Cache LRU bersama (satu per proses) untuk figure Plotly dan frame siap
+    tampil. Kunci berisi versi data + state filter, jadi entri lama otomatis
+    tidak terpakai lagi dan tergusur oleh batas memori."""
+
+    def __init__(self, max_bytes=MAX_BYTES, max_items=MAX_ITEMS):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self._items = OrderedDict() # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key][0]
+            self.misses += 1
+        # Dibangun di luar lock; jika dua sesi membangun bersamaan, hasil terakhir yang disimpan
+        value = build()
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._items:
+                self._bytes -= self._items.pop(key)[1]
+            self._items[key] = (value, size)
+            self._bytes += size
+            while len(self._items) > 1 and (self._bytes > self.max_bytes or len(self._items) > self.max_items):
+                _, (_, old_size) = self._items.popitem(last=False)
+                self._bytes -= old_size
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {"items": len(self._items), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
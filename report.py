@@ -0,0 +1,267 @@
+import argparse
+import datetime
+import html
+import json
+import math
+import os
+import time
+
+import pandas as pd
+import plotly.graph_objects as go
+
+import data_cache
+import data_store
+import kpi
+
+# --- KONFIGURASI LAPORAN ---
+# KPI harian & month-to-date estate + tiap afdeling dihitung sekali dengan modul kpi (sama dengan Tab 1),
+# lalu ditulis sebagai snapshot statis; dashboard membaca snapshot ini alih-alih menghitung ulang.
+MASTER_PATH = "master_data_produksi.xlsx"
+REPORT_DIR = "laporan"
+LATEST = "terbaru" # laporan/terbaru.json & .html selalu menunjuk laporan terakhir
+ESTATE = "ESTATE"
+PERIODE = {"harian": "Harian", "mtd": "Month-to-Date"}
+# (kunci KPI, label kolom, format); afdeling hanya punya produksi & grading di workbook
+KOLOM = (
+    ("prod", "Produksi", "{:,.2f}"),
+    ("akp", "AKP", "{:,.2f}"),
+    ("pct_budget", "Budget %", "{:,.1f}%"),
+    ("pct_bbc", "BBC %", "{:,.1f}%"),
+    ("mentah", "Mentah %", "{:,.2f}%"),
+    ("mengkal", "Mengkal %", "{:,.2f}%"),
+    ("curah", "C. Hujan (mm)", "{:,.0f}"),
+    ("tk_panen", "TK Panen", "{:,.0f}"),
+)
+
+
+# --- PERHITUNGAN ---
+def _plain(value):
+    # JSON tidak mengenal NaN/np.float64 -> float biasa atau None
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def build(series, tanggal=None):
+    """KPI semua unit untuk satu tanggal: {"unit": {ESTATE/afd: {periode: {kpi: nilai}}}, ...}."""
+    dash = series["Dashboard"]
+    if dash.empty:
+        return None
+    awal, akhir = dash.span()
+    tanggal = pd.Timestamp(tanggal).normalize() if tanggal is not None else akhir
+    # Awal MTD = tanggal 1, atau awal data jika workbook dimulai di tengah bulan (sama dengan filter default dashboard)
+    mulai = max(tanggal.replace(day=1), min(awal, tanggal))
+
+    kpi_cols = kpi.kpi_columns(tuple(dash.frame.columns), tuple(series["Budget & BBC"].frame.columns))
+    afd_cols = kpi.afdeling_columns(tuple(series["Prod Afd"].frame.columns), tuple(series["Grading Mentah"].frame.columns))
+    y, m = tanggal.year, tanggal.month
+    prod_mtd = dash.month_sum("Aktual Produksi", y, m)
+    total_budget = series["Budget & BBC"].month_sum(kpi_cols.budget, y, m)
+    total_bbc = series["Budget & BBC"].month_sum(kpi_cols.bbc, y, m)
+
+    unit = {ESTATE: {}, **{c.afd: {} for c in afd_cols}}
+    for periode, (a, b) in {"harian": (tanggal, tanggal), "mtd": (mulai, tanggal)}.items():
+        f_dash, f_prod, f_mentah, f_mengkal = [series[s].window(a, b) for s in ("Dashboard", "Prod Afd", "Grading Mentah", "Grading Mengkal")]
+        estate = kpi.dashboard_kpis(f_dash, f_mentah, f_mengkal, kpi_cols, prod_mtd, total_budget, total_bbc)
+        unit[ESTATE][periode] = {k: _plain(v) for k, v in estate.items()}
+        for afd, values in kpi.afdeling_kpis(f_prod, f_mentah, f_mengkal, afd_cols).items():
+            unit[afd][periode] = {k: _plain(v) for k, v in values.items()}
+
+    return {
+        "tanggal": tanggal.strftime("%Y-%m-%d"),
+        "mulai": mulai.strftime("%Y-%m-%d"),
+        "dibuat": datetime.datetime.now().isoformat(timespec="seconds"),
+        "unit": unit,
+    }
+
+
+def table(lap, periode):
+    """Tabel tampilan satu periode: satu baris per unit, kolom sesuai KOLOM (NaN = tidak tersedia)."""
+    rows = [{"Unit": u if u == ESTATE else f"Afd {u}", **{label: lap["unit"][u][periode].get(k) for k, label, _ in KOLOM}}
+            for u in lap["unit"]]
+    return pd.DataFrame(rows).astype({label: float for _, label, _ in KOLOM})
+
+
+def unit_kpis(lap, unit=ESTATE, periode="mtd"):
+    # Nilai kosong di JSON dikembalikan ke NaN, sama seperti hasil kpi.dashboard_kpis
+    return {k: float("nan") if v is None else v for k, v in lap["unit"][unit][periode].items()}
+
+
+# --- RENDER HTML / PNG ---
+def _figure(lap):
+    afd = [u for u in lap["unit"] if u != ESTATE]
+    fig = go.Figure(go.Bar(x=[f"Afd {u}" for u in afd], y=[lap["unit"][u]["mtd"]["prod"] for u in afd],
+                           marker_color="#00602B", texttemplate="%{y:.1f}"))
+    fig.update_layout(title=f"Produksi MTD per Afdeling (Ton) · s.d. {lap['tanggal']}", height=360,
+                      margin=dict(l=10, r=10, t=40, b=10), plot_bgcolor="rgba(0,0,0,0)")
+    return fig
+
+
+def _html_table(lap, periode):
+    head = "".join(f"<th>{html.escape(label)}</th>" for _, label, _ in KOLOM)
+    body = []
+    for u, values in lap["unit"].items():
+        cells = "".join(f"<td>{fmt.format(values[periode][k]) if values[periode].get(k) is not None else '-'}</td>" for k, _, fmt in KOLOM)
+        name = u if u == ESTATE else f"Afd {u}"
+        body.append(f'<tr class="{"estate" if u == ESTATE else ""}"><th>{html.escape(name)}</th>{cells}</tr>')
+    return f"<table><thead><tr><th>Unit</th>{head}</tr></thead><tbody>{''.join(body)}</tbody></table>"
+
+
+def render_html(lap):
+    tanggal = pd.Timestamp(lap["tanggal"]).strftime("%d/%m/%Y")
+    mulai = pd.Timestamp(lap["mulai"]).strftime("%d/%m/%Y")
+    chart = _figure(lap).to_html(full_html=False, include_plotlyjs="cdn")
+    return f"""<!DOCTYPE html>
+<html lang="id"><head><meta charset="utf-8"><title>Laporan Harian {tanggal}</title>
+<style>
+body {{ font-family: 'Inter', sans-serif; background: #f8fafc; color: #1e293b; margin: 24px; }}
+h1 {{ background: #3366FF; color: white; padding: 10px 16px; font-size: 18px; border-radius: 6px; }}
+table {{ border-collapse: collapse; background: white; margin-bottom: 24px; width: 100%; }}
+th, td {{ border: 1px solid #e2e8f0; padding: 6px 10px; text-align: right; font-size: 13px; }}
+thead th {{ background: #204348; color: white; }}
+tbody th {{ text-align: left; }}
+tr.estate {{ font-weight: 700; background: #f1f5f9; }}
+.catatan {{ color: #64748b; font-size: 12px; }}
+</style></head><body>
+<h1>PT. REZEKI KENCANA - Laporan Produksi {tanggal}</h1>
+<h3>{PERIODE["harian"]} ({tanggal})</h3>
+{_html_table(lap, "harian")}
+<h3>{PERIODE["mtd"]} ({mulai} - {tanggal})</h3>
+{_html_table(lap, "mtd")}
+{chart}
+<p class="catatan">Dibuat {html.escape(lap["dibuat"])}. Budget/BBC %, AKP, curah hujan &amp; TK panen hanya tersedia di level estate. Budget/BBC % memakai produksi bulan berjalan.</p>
+</body></html>
+"""
+
+
+def _atomic_write(path, data):
+    # Ditulis ke file sementara lalu di-rename: dashboard tidak pernah membaca laporan setengah jadi
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data.encode("utf-8") if isinstance(data, str) else data)
+    os.replace(tmp, path)
+
+
+def write(lap, out_dir=REPORT_DIR, png=False):
+    """Tulis laporan_<tanggal>.json/.html (+ .png) dan salinan terbaru.*; kembalikan daftar file."""
+    os.makedirs(out_dir, exist_ok=True)
+    name = f"laporan_{lap['tanggal']}"
+    outputs = {".json": json.dumps(lap, indent=2, ensure_ascii=False), ".html": render_html(lap)}
+    if png:
+        try:
+            outputs[".png"] = _figure(lap).to_image(format="png", width=900, height=360)
+        except Exception as e:
+            print(f"⚠️ PNG dilewati (butuh paket kaleido): {e}")
+    written = []
+    for ext, data in outputs.items():
+        for base in (name, LATEST):
+            path = os.path.join(out_dir, base + ext)
+            _atomic_write(path, data)
+            written.append(path)
+    return written
+
+
+def generate(master_path=MASTER_PATH, out_dir=REPORT_DIR, tanggal=None, png=False):
+    """Satu lintasan batch: baca workbook (lewat cache kolomar), hitung semua unit, tulis snapshot."""
+    # Kunci file diambil sebelum dibaca: jika workbook disimpan saat laporan dibuat, laporan langsung dianggap usang
+    key = data_cache.file_key(master_path)
+    lap = build(data_store.build_series(data_store.read_master(master_path)), tanggal)
+    if lap is None:
+        return None, []
+    lap["sumber"] = {"size": key["size"], "mtime": key["mtime"]}
+    return lap, write(lap, out_dir, png)
+
+
+# --- DIBACA DASHBOARD ---
+_latest = {} # path -> (mtime, laporan); JSON hanya dibaca ulang saat file berganti
+
+
+def latest(out_dir=REPORT_DIR):
+    """Laporan terbaru (dict) atau None jika belum pernah dibuat / tidak terbaca."""
+    path = os.path.join(out_dir, LATEST + ".json")
+    try:
+        mtime = os.stat(path).st_mtime
+        if _latest.get(path, (None,))[0] != mtime:
+            with open(path, encoding="utf-8") as f:
+                _latest[path] = (mtime, json.load(f))
+        return _latest[path][1]
+    except:
+        return None
+
+
+def read_html(lap, out_dir=REPORT_DIR):
+    # File HTML yang sudah ditulis saat laporan dibuat (tidak dirender ulang)
+    with open(os.path.join(out_dir, f"laporan_{lap['tanggal']}.html"), "rb") as f:
+        return f.read()
+
+
+def fresh(lap, master_path=MASTER_PATH):
+    """True jika workbook belum berubah sejak laporan dibuat."""
+    try:
+        key = data_cache.file_key(master_path)
+        return lap["sumber"] == {"size": key["size"], "mtime": key["mtime"]}
+    except:
+        return False
+
+
+def matches(lap, master_path, start, end):
+    """Laporan bisa menggantikan perhitungan live untuk rentang [start, end]?"""
+    return (lap is not None and lap["mulai"] == pd.Timestamp(start).strftime("%Y-%m-%d")
+            and lap["tanggal"] == pd.Timestamp(end).strftime("%Y-%m-%d") and fresh(lap, master_path))
+
+
+# --- CLI / PENJADWAL ---
+CONTOH = """contoh:
+  python report.py                      # sekali, untuk tanggal terakhir di workbook
+  python report.py --tanggal 2026-02-15 # tanggal tertentu
+  python report.py --jadwal 06:00       # jalan terus, laporan dibuat tiap hari jam 06:00
+  python report.py --pantau 60          # jalan terus, laporan dibuat ulang saat workbook berubah"""
+
+
+def _next_run(jam, now):
+    h, m = (int(x) for x in jam.split(":"))
+    target = now.replace(hour=h, minute=m, second=0, microsecond=0)
+    return target if target > now else target + datetime.timedelta(days=1)
+
+
+def _run(args):
+    lap, written = generate(args.master, args.dir, args.tanggal, args.png)
+    if lap is None:
+        print("❌ Sheet Dashboard kosong, laporan tidak dibuat.")
+        return
+    print(f"✅ Laporan {lap['tanggal']} ditulis: {', '.join(written)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Buat laporan harian estate & afdeling (JSON/HTML/PNG).",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter, epilog=CONTOH)
+    parser.add_argument("--master", default=MASTER_PATH, help="workbook master")
+    parser.add_argument("--dir", default=REPORT_DIR, help="folder output laporan")
+    parser.add_argument("--tanggal", help="tanggal laporan YYYY-MM-DD (default: tanggal terakhir di workbook)")
+    parser.add_argument("--png", action="store_true", help="tulis juga grafik PNG (butuh kaleido)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--jadwal", metavar="HH:MM", help="jalan terus, buat laporan tiap hari pada jam ini")
+    mode.add_argument("--pantau", type=float, metavar="DETIK", help="jalan terus, buat ulang laporan saat workbook berubah")
+    args = parser.parse_args()
+
+    if not args.jadwal and not args.pantau:
+        _run(args)
+        return
+    while True:
+        try:
+            if args.jadwal:
+                time.sleep(max(0.0, (_next_run(args.jadwal, datetime.datetime.now()) - datetime.datetime.now()).total_seconds()))
+                _run(args)
+            else:
+                if not fresh(latest(args.dir), args.master):
+                    _run(args)
+                time.sleep(args.pantau)
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            # Workbook sedang disimpan Excel dsb -> coba lagi di putaran berikutnya
+            print(f"⚠️ Laporan gagal dibuat: {e}")
+            time.sleep(args.pantau or 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import openpyxl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_cache
+
+
+def _save(path, values):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Dashboard"
+    ws.append(["No", "Nilai"])
+    for i, v in enumerate(values, start=1):
+        ws.append([i, v])
+    wb.save(path)
+    # mtime dinaikkan agar kunci file pasti berubah walau disimpan dalam detik yang sama
+    st_ = os.stat(path)
+    os.utime(path, ns=(st_.st_atime_ns, st_.st_mtime_ns + 10**9))
+
+
+def _load(path):
+    data_cache.clear_memo()
+    return data_cache.load_workbook(str(path), ("Dashboard",))["Dashboard"]["Nilai"].tolist()
+
+
+def test_edit_existing_row(tmp_path):
+    path = tmp_path / "book.xlsx"
+    _save(path, [1, 2, 3, 4])
+    assert _load(path) == [1, 2, 3, 4]
+    _save(path, [1, 20, 3, 4])
+    assert _load(path) == [1, 20, 3, 4]
+
+
+def test_edit_plus_append(tmp_path):
+    path = tmp_path / "book.xlsx"
+    _save(path, [1, 2, 3, 4])
+    assert _load(path) == [1, 2, 3, 4]
+    _save(path, [1, 20, 30, 4, 5])
+    assert _load(path) == [1, 20, 30, 4, 5]
+
+
+def test_append_only(tmp_path):
+    path = tmp_path / "book.xlsx"
+    _save(path, [1, 2, 3, 4])
+    assert _load(path) == [1, 2, 3, 4]
+    _save(path, [1, 2, 3, 4, 5, 6])
+    assert _load(path) == [1, 2, 3, 4, 5, 6]
+    meta = data_cache._read_meta(data_cache.cache_dir_for(str(path)))
+    assert len(meta["sheets"]["Dashboard"]["files"]) == 2 # baris baru ditulis sebagai chunk delta
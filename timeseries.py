@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+
+class DateIndexed:
+    """Frame harian terurut menurut Tanggal. Dibangun sekali per versi data;
+    pemilihan rentang memakai binary search (searchsorted) dan mengembalikan
+    slice baris berurutan, sehingga biaya per interaksi mengikuti panjang
+    jendela, bukan panjang histori."""
+
+    def __init__(self, df, date_col='Tanggal'):
+        if df.empty or date_col not in df.columns:
+            self.dates = np.array([], dtype='datetime64[ns]')
+            self.frame = pd.DataFrame(columns=['Tgl'])
+            return
+        df = df[df[date_col].notna()].sort_values(date_col, kind='stable')
+        self.dates = df[date_col].to_numpy(dtype='datetime64[ns]')
+        frame = df.drop(columns=[date_col]).reset_index(drop=True)
+        # Label tampilan dihitung sekali di sini, bukan strftime per rerun
+        frame.insert(0, 'Tgl', df[date_col].dt.strftime('%d/%m').to_numpy())
+        self.frame = frame
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def empty(self):
+        return len(self.dates) == 0
+
+    def span(self):
+        """(tanggal pertama, tanggal terakhir) tanpa memindai kolom."""
+        return pd.Timestamp(self.dates[0]), pd.Timestamp(self.dates[-1])
+
+    def bounds(self, start, end):
+        """Indeks [lo, hi) untuk Tanggal di [start, end] (inklusif)."""
+        lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start), 'ns'), side='left')
+        hi = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end), 'ns'), side='right')
+        return lo, hi
+
+    def window(self, start, end):
+        lo, hi = self.bounds(start, end)
+        return self.frame.iloc[lo:hi]
+
+    def window_dates(self, start, end):
+        lo, hi = self.bounds(start, end)
+        return self.dates[lo:hi]
+
+    def month(self, year, month):
+        start = pd.Timestamp(year=year, month=month, day=1)
+        lo, hi = np.searchsorted(self.dates, np.array([start, start + pd.offsets.MonthBegin(1)], dtype='datetime64[ns]'))
+        return self.frame.iloc[lo:hi]
+
+    def month_sum(self, column, year, month):
+        if column is None or column not in self.frame.columns:
+            return 0
+        # Dijumlah dalam float64: kolom bisa tersimpan float32/int32 (tipe ringkas)
+        return np.nansum(pd.to_numeric(self.month(year, month)[column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan))